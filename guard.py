@@ -3,22 +3,35 @@ from __future__ import annotations
 
 import argparse
 import fnmatch
+import hashlib
+import json
 import os
 import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Iterator, List, Tuple
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 EXIT_OK = 0
 EXIT_FINDINGS = 2
 EXIT_ERROR = 1
 
 DEFAULT_CONFIG = "ops_guard.yml"
+DEFAULT_MAX_BYTES = 1 << 20
+SNIFF_BYTES = 4096
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Finding:
     kind: str
     path: str
@@ -30,37 +43,114 @@ class Finding:
         return f"[{self.kind}] {self.path}{loc} - {self.message}"
 
 
+def config_cache_path(p: Path) -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    digest = hashlib.sha1(str(p.resolve()).encode("utf-8")).hexdigest()
+    return Path(base) / "ops-guard" / f"{digest}.json"
+
+
 def load_config(repo_root: Path, config_path: str) -> dict:
     p = repo_root / config_path
     if not p.exists():
         raise FileNotFoundError(f"Config not found: {p}")
+    st = p.stat()
+    key = f"{p.resolve()}:{st.st_mtime_ns}:{st.st_size}"
+    cache: Path | None = None
+    try:
+        cache = config_cache_path(p)
+        with cache.open("r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return cached["config"]
+    except (OSError, RuntimeError, ValueError, TypeError, KeyError):
+        pass
+
     with p.open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+        cfg = yaml.load(f, Loader=_Loader) or {}
+    if cache is None:
+        return cfg
+    try:
+        dumped = json.dumps({"key": key, "config": cfg})
+        if json.loads(dumped)["config"] != cfg:
+            return cfg
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        with cache.open("w", encoding="utf-8") as f:
+            f.write(dumped)
+    except (OSError, TypeError, ValueError):
+        pass
+    return cfg
 
 
 def repo_root_from_cwd() -> Path:
     return Path.cwd().resolve()
 
 
-def glob_paths(root: Path, patterns: List[str]) -> List[Path]:
-    out: List[Path] = []
-    for pat in patterns:
-        for p in root.rglob("*"):
-            rel = p.relative_to(root).as_posix()
-            if fnmatch.fnmatch(rel, pat):
-                out.append(p)
-    seen = set()
-    uniq = []
-    for p in out:
-        if p in seen:
+@lru_cache(maxsize=256)
+def compile_rx(rx: str | bytes, flags: int = 0) -> re.Pattern:
+    return re.compile(rx, flags)
+
+
+_PRUNE_DIRS = {".git", "node_modules", ".venv"}
+_GLOB_META_RX = re.compile(r"[*?\[]")
+
+
+def _literal_prefix_dir(pat: str) -> str:
+    m = _GLOB_META_RX.search(pat)
+    head = pat[:m.start()] if m else pat
+    base = head[:max(head.rfind("/"), 0)]
+    if os.path.isabs(base) or any(part in ("", ".", "..") for part in base.split("/")):
+        return ""
+    return base
+
+
+def _has_symlink(root_str: str, base: str) -> bool:
+    path = root_str
+    for part in base.split("/"):
+        path = os.path.join(path, part)
+        if os.path.islink(path):
+            return True
+    return False
+
+
+def glob_regex(patterns: List[str]) -> re.Pattern:
+    return compile_rx("|".join(fnmatch.translate(pat) for pat in patterns))
+
+
+def _walk(starts: List[str]) -> Iterator[os.DirEntry]:
+    stack = list(starts)
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
             continue
-        seen.add(p)
-        uniq.append(p)
-    return uniq
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if e.name in _PRUNE_DIRS:
+                        continue
+                    stack.append(e.path)
+                yield e
 
 
-def is_excluded(rel_posix: str, exclude_globs: List[str]) -> bool:
-    return any(fnmatch.fnmatch(rel_posix, pat) for pat in exclude_globs)
+def glob_entries(root: Path, patterns: List[str]) -> List[os.DirEntry]:
+    if not patterns:
+        return []
+    rx = glob_regex(patterns)
+    bases = {_literal_prefix_dir(pat) for pat in patterns}
+    if "" in bases:
+        bases = {""}
+    else:
+        bases = {b for b in bases if not any(b.startswith(o + "/") for o in bases)}
+
+    root_str = str(root)
+    off = len(os.path.join(root_str, ""))
+    starts = [
+        os.path.join(root_str, b) if b else root_str
+        for b in sorted(bases) if not (b and _has_symlink(root_str, b))
+    ]
+    if os.sep == "/":
+        return [e for e in _walk(starts) if rx.match(e.path[off:])]
+    return [e for e in _walk(starts) if rx.match(e.path[off:].replace(os.sep, "/"))]
 
 
 def check_required_env(cfg: dict) -> List[Finding]:
@@ -77,71 +167,132 @@ def check_required_env(cfg: dict) -> List[Finding]:
     return findings
 
 
-def scan_secrets(cfg: dict, root: Path) -> List[Finding]:
+_INLINE_FLAGS_RX = re.compile(r"\(\?([aiLmsux]+)\)")
+_BACKREF_RX = re.compile(r"\\[1-9]|\(\?P=")
+_STRING_ANCHOR_RX = re.compile(r"\\[AZ]")
+_ANY_LINE_RX = re.compile(rb"^", re.MULTILINE)
+
+
+def union_regex(regexes: List[str]) -> re.Pattern:
+    parts = []
+    for rx in regexes:
+        if _BACKREF_RX.search(rx) or _STRING_ANCHOR_RX.search(rx):
+            return _ANY_LINE_RX
+        m = _INLINE_FLAGS_RX.match(rx)
+        if m:
+            rx = f"(?{m.group(1)}:{rx[m.end():]})"
+        parts.append(f"(?:{rx})")
+    try:
+        return compile_rx("|".join(parts).encode("utf-8"), re.MULTILINE)
+    except re.error:
+        return _ANY_LINE_RX
+
+
+@lru_cache(maxsize=32)
+def _secret_patterns(regexes: Tuple[str, ...]) -> Tuple[re.Pattern, List[Tuple[re.Pattern, bool]]]:
+    compiled = [
+        (compile_rx(rx.encode("utf-8"), re.MULTILINE), bool(_STRING_ANCHOR_RX.search(rx)))
+        for rx in regexes
+    ]
+    return union_regex(list(regexes)), compiled
+
+
+@dataclass
+class Check:
+    include_globs: List[str]
+    exclude_globs: List[str]
+    scan: Callable[[bytes, str], List[Finding]]
+    max_bytes: int | None = None
+    skip_binary: bool = False
+    fail_fast: bool = False
+
+
+def secret_check(cfg: dict) -> Check | None:
     ss = cfg.get("secret_scan") or {}
     if not ss.get("enabled", True):
-        return []
+        return None
     include_globs = ss.get("include_globs") or ["**/*"]
     exclude_globs = ss.get("exclude_globs") or []
+    max_bytes = int(ss.get("max_bytes", DEFAULT_MAX_BYTES))
+    fail_fast = bool(ss.get("fail_fast", False))
     patterns = ss.get("patterns") or []
 
-    compiled: List[Tuple[str, re.Pattern]] = []
+    names: List[str] = []
+    regexes: List[str] = []
     for it in patterns:
-        name = it.get("name", "pattern")
         rx = it.get("regex", "")
         if not rx:
             continue
-        compiled.append((name, re.compile(rx)))
+        names.append(it.get("name", "pattern"))
+        regexes.append(rx)
+    if not regexes:
+        return None
+    key = tuple(regexes)
 
-    candidates = glob_paths(root, include_globs)
-    findings: List[Finding] = []
-    for p in candidates:
-        if p.is_dir():
-            continue
-        rel = p.relative_to(root).as_posix()
-        if is_excluded(rel, exclude_globs):
-            continue
-        try:
-            text = p.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            continue
-
-        for i, line in enumerate(text.splitlines(), start=1):
-            for name, rx in compiled:
-                if rx.search(line):
+    def scan(data: bytes, rel: str) -> List[Finding]:
+        findings: List[Finding] = []
+        prefilter, compiled = _secret_patterns(key)
+        n = len(data)
+        pos = last = 0
+        i = 1
+        while pos <= n:
+            m = prefilter.search(data, pos)
+            if not m:
+                break
+            start = data.rfind(b"\n", 0, m.start()) + 1
+            end = data.find(b"\n", m.start())
+            if end < 0:
+                end = n
+            i += data.count(b"\n", last, start)
+            last = start
+            pos = end + 1
+            line = None
+            for name, (rx, sliced) in zip(names, compiled):
+                if sliced:
+                    if line is None:
+                        line = data[start:end]
+                    hit = rx.search(line)
+                else:
+                    hit = rx.search(data, start, end)
+                if hit:
                     findings.append(Finding(
                         kind="secret-scan",
                         path=rel,
                         line=i,
                         message=f"Possible secret detected ({name})"
                     ))
-    return findings
+                    if fail_fast:
+                        return findings
+        return findings
 
+    return Check(include_globs, exclude_globs, scan, max_bytes, True, fail_fast)
 
-_SLEEP_RX = re.compile(r"\bsleep\s+([0-9]+)\b")
 
+def iter_matches(rx: re.Pattern, data: bytes) -> Iterator[Tuple[int, re.Match]]:
+    i = 1
+    last = 0
+    for m in rx.finditer(data):
+        i += data.count(b"\n", last, m.start())
+        last = m.start()
+        yield i, m
 
-def scan_workflow_waste(cfg: dict, root: Path) -> List[Finding]:
+
+_SLEEP_RX = re.compile(rb"\bsleep[^\S\n]+([0-9]+)\b")
+WORKFLOW_GLOBS = [".github/workflows/*.yml", ".github/workflows/*.yaml"]
+
+
+def workflow_waste_check(cfg: dict) -> Check | None:
     ws = cfg.get("workflow_waste_scan") or {}
     if not ws.get("enabled", True):
-        return []
+        return None
     max_sleep = int(ws.get("max_sleep_seconds", 300))
-    globs = ws.get("workflow_globs") or [".github/workflows/*.yml", ".github/workflows/*.yaml"]
-    paths = glob_paths(root, globs)
+    globs = ws.get("workflow_globs") or WORKFLOW_GLOBS
 
-    findings: List[Finding] = []
-    for p in paths:
-        if not p.is_file():
-            continue
-        rel = p.relative_to(root).as_posix()
-        try:
-            txt = p.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            continue
-        for i, line in enumerate(txt.splitlines(), start=1):
-            m = _SLEEP_RX.search(line)
-            if not m:
-                continue
+    def scan(data: bytes, rel: str) -> List[Finding]:
+        findings: List[Finding] = []
+        if b"sleep" not in data:
+            return findings
+        for i, m in iter_matches(_SLEEP_RX, data):
             secs = int(m.group(1))
             if secs > max_sleep:
                 findings.append(Finding(
@@ -150,39 +301,32 @@ def scan_workflow_waste(cfg: dict, root: Path) -> List[Finding]:
                     line=i,
                     message=f"sleep {secs}s exceeds max_sleep_seconds={max_sleep}"
                 ))
-    return findings
+        return findings
 
+    return Check(globs, [], scan)
 
-_USES_RX = re.compile(r"^\s*uses:\s*([^\s]+)\s*$")
 
+_USES_RX = re.compile(rb"^[^\S\n]*uses:[^\S\n]*(\S+)[^\S\n]*$", re.MULTILINE)
+_HEXSET = frozenset("0123456789abcdef")
 
-def scan_action_pinning(cfg: dict, root: Path) -> List[Finding]:
+
+def action_pinning_check(cfg: dict) -> Check | None:
     ap = cfg.get("action_pinning") or {}
     if not ap.get("enabled", True):
-        return []
-    globs = [".github/workflows/*.yml", ".github/workflows/*.yaml"]
-    paths = glob_paths(root, globs)
+        return None
 
-    findings: List[Finding] = []
-    for p in paths:
-        if not p.is_file():
-            continue
-        rel = p.relative_to(root).as_posix()
-        try:
-            txt = p.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            continue
-        for i, line in enumerate(txt.splitlines(), start=1):
-            m = _USES_RX.match(line)
-            if not m:
-                continue
-            uses = m.group(1)
+    def scan(data: bytes, rel: str) -> List[Finding]:
+        findings: List[Finding] = []
+        if b"uses:" not in data:
+            return findings
+        for i, m in iter_matches(_USES_RX, data):
+            uses = m.group(1).decode("utf-8", errors="replace")
             if uses.startswith("./"):
                 continue
             if "@" not in uses:
                 continue
             ref = uses.split("@", 1)[1]
-            if re.fullmatch(r"[0-9a-f]{40}", ref):
+            if len(ref) == 40 and _HEXSET.issuperset(ref):
                 continue
             findings.append(Finding(
                 kind="action-pinning",
@@ -190,16 +334,107 @@ def scan_action_pinning(cfg: dict, root: Path) -> List[Finding]:
                 line=i,
                 message=f"Action not pinned to a commit SHA: {uses}"
             ))
-    return findings
+        return findings
+
+    return Check(WORKFLOW_GLOBS, [], scan)
+
+
+_LINE_BREAK_RX = re.compile(rb"[\r\x0b\x0c\x1c\x1d\x1e]")
+_LINE_BREAKS = bytes.maketrans(b"\r\x0b\x0c\x1c\x1d\x1e", b"\n" * 6)
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def _scan_file(
+    stops: List[threading.Event],
+    e: os.DirEntry,
+    rel: str,
+    applicable: List[Tuple[int, Check]],
+) -> List[Tuple[int, List[Finding]]]:
+    applicable = [(k, c) for k, c in applicable if not stops[k].is_set()]
+    if not applicable:
+        return []
+    try:
+        size = e.stat().st_size
+        applicable = [(k, c) for k, c in applicable if c.max_bytes is None or size <= c.max_bytes]
+        if not applicable:
+            return []
+        with open(e.path, "rb") as fh:
+            head = fh.read(SNIFF_BYTES)
+            if b"\x00" in head:
+                applicable = [(k, c) for k, c in applicable if not c.skip_binary]
+                if not applicable:
+                    return []
+            data = head + fh.read()
+    except Exception:
+        return []
+    if _LINE_BREAK_RX.search(data):
+        data = data.replace(b"\r\n", b"\n").translate(_LINE_BREAKS)
+    out: List[Tuple[int, List[Finding]]] = []
+    for k, c in applicable:
+        found = c.scan(data, rel)
+        if found and c.fail_fast:
+            stops[k].set()
+        out.append((k, found))
+    return out
+
+
+def run_checks(root: Path, checks: List[Check | None]) -> List[List[Finding]]:
+    results: List[List[Finding]] = [[] for _ in checks]
+    active = [
+        (k, c, glob_regex(c.include_globs), glob_regex(c.exclude_globs) if c.exclude_globs else None)
+        for k, c in enumerate(checks) if c is not None
+    ]
+    entries = glob_entries(root, [pat for _, c, _, _ in active for pat in c.include_globs])
+
+    off = len(os.path.join(str(root), ""))
+    files: List[os.DirEntry] = []
+    rels: List[str] = []
+    applicables: List[List[Tuple[int, Check]]] = []
+    for e in entries:
+        if not e.is_file():
+            continue
+        rel = e.path[off:]
+        if os.sep != "/":
+            rel = rel.replace(os.sep, "/")
+        applicable = [
+            (k, c) for k, c, include, exclude in active
+            if include.match(rel) and not (exclude and exclude.match(rel))
+        ]
+        if not applicable:
+            continue
+        files.append(e)
+        rels.append(rel)
+        applicables.append(applicable)
+
+    stops = [threading.Event() for _ in checks]
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as ex:
+        for out in ex.map(partial(_scan_file, stops), files, rels, applicables):
+            for k, found in out:
+                results[k] += found
+    return [r[:1] if c is not None and c.fail_fast else r for c, r in zip(checks, results)]
+
+
+def scan_secrets(cfg: dict, root: Path) -> List[Finding]:
+    return run_checks(root, [secret_check(cfg)])[0]
+
+
+def scan_workflow_waste(cfg: dict, root: Path) -> List[Finding]:
+    return run_checks(root, [workflow_waste_check(cfg)])[0]
+
+
+def scan_action_pinning(cfg: dict, root: Path) -> List[Finding]:
+    return run_checks(root, [action_pinning_check(cfg)])[0]
+
+
+def format_section(title: str, findings: List[Finding]) -> str:
+    return f"{title}:\n" + "".join(f" - {f.format()}\n" for f in findings)
 
 
 def print_report(findings: List[Finding]) -> None:
     if not findings:
         print("OK: no findings")
         return
-    print("Findings:")
-    for f in findings:
-        print(" - " + f.format())
+    sys.stdout.write(format_section("Findings", findings))
 
 
 def main() -> int:
@@ -215,14 +450,18 @@ def main() -> int:
 
         findings: List[Finding] = []
         findings += check_required_env(cfg)
-        findings += scan_secrets(cfg, root)
-        findings += scan_workflow_waste(cfg, root)
+        secrets, waste, pin = run_checks(root, [
+            secret_check(cfg),
+            workflow_waste_check(cfg),
+            action_pinning_check(cfg),
+        ])
+        findings += secrets
+        findings += waste
+        findings = list(dict.fromkeys(findings))
+        pin = list(dict.fromkeys(pin))
 
-        pin = scan_action_pinning(cfg, root)
         if pin:
-            print("Warnings:")
-            for f in pin:
-                print(" - " + f.format())
+            sys.stdout.write(format_section("Warnings", pin))
 
         print_report(findings)
         return EXIT_FINDINGS if findings else EXIT_OK